@@ -42,12 +42,10 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[
-        # 1. Your app data files
-        ('tasks.json', '.'),
-        ('rewards.json', '.'),
-        ('xp_log.csv', '.'),
+        # No app data files here: the app reads and writes tasks.json, rewards.json and
+        # xp_log.jsonl next to the exe, never in the bundle's temporary extraction folder.
 
-        # 2. Add Plotly/Pandas/Streamlit hidden assets
+        # Add Plotly/Pandas/Streamlit hidden assets
         # PyInstaller's hooks should handle the internal assets for the collected packages.
     ],
     hiddenimports=hidden_imports_list,
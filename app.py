@@ -1,29 +1,29 @@
 # app.py
 import streamlit as st
-import pandas as pd
-import json
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to the stdlib encoder
+    orjson = None
+    import json
 import os
 import calendar
-import numpy as np 
+import hashlib
+import tempfile
 from datetime import datetime, date, timedelta
-import plotly.express as px
-import time
 import sys # <--- ADDED IMPORT
+from streamlit_autorefresh import st_autorefresh
 
 # ----------------------------
 # Helpers: Fix PyInstaller Pathing
 # ----------------------------
-def resource_path(relative_path):
-    """Get the absolute path to a resource, works for dev and for PyInstaller."""
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        # This is where your added data files are extracted.
-        base_path = sys._MEIPASS
-    except Exception:
-        # If not running in PyInstaller, use the normal path (current directory)
-        base_path = os.path.abspath(".")
+# Data files live next to the executable when frozen by PyInstaller (not in _MEIPASS:
+# a onefile build extracts that to a temp folder that is deleted on exit).
+# If not running in PyInstaller, use the normal path (current directory)
+_BASE = os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.abspath(".")
 
-    return os.path.join(base_path, relative_path)
+def resource_path(relative_path):
+    """Absolute path of a data file: next to the exe when frozen, else in the working directory."""
+    return os.path.join(_BASE, relative_path)
 
 # ----------------------------
 # File paths (same folder as app.py)
@@ -31,47 +31,331 @@ def resource_path(relative_path):
 # --- UPDATED TO USE THE HELPER FUNCTION ---
 TASKS_FILE = resource_path("tasks.json")
 REWARDS_FILE = resource_path("rewards.json")
-LOG_FILE = resource_path("xp_log.csv")
+LOG_FILE = resource_path("xp_log.jsonl")
+LEGACY_LOG_FILE = resource_path("xp_log.csv")  # pre-JSONL log, migrated on first load
+LOG_COLUMNS = ["time", "type", "name", "minutes", "xp"]
+LOG_DTYPES = {"type": str, "name": str, "minutes": "int64", "xp": "float64"}
+WEEK_DAYS = ("Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
 # ----------------------------
 # Helpers: load/save persistent data
 # ----------------------------
+def json_dumps(obj, indent=False):
+    """Serialize obj to UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 def load_json(path):
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    try:
+        with open(path, "rb") as f:
+            return json_loads(f.read())
+    except FileNotFoundError:
+        return {}
 
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    payload = json_dumps(data, indent=True)
+    # Saving the same content again (e.g. re-submitting an unchanged task) skips the disk,
+    # unless the file was changed or removed behind our back since we wrote it
+    if _written_digests().get(path) == (_digest(payload), _file_stamp(path)):
+        return
+    _atomic_write(path, payload)
+
+@st.cache_resource(show_spinner=False)
+def _written_digests():
+    """(digest, file stamp) of the bytes last written to each file by this process (shared across reruns)."""
+    return {}
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+def _file_stamp(path):
+    """Size and mtime of path, or None if it does not exist."""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_size, info.st_mtime_ns
+
+def _atomic_write(path, data):
+    """Writes bytes to path via a temp file + os.replace, so the file is never left half-written."""
+    # Unique temp name in the same folder: sessions run on separate threads and may save at once
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    _written_digests()[path] = (_digest(data), _file_stamp(path))
+
+def _write_empty_json(path):
+    _atomic_write(path, b"{}")
+
+def with_xp_per_min(entries):
+    """Fills in the derived xp_per_min for tasks/rewards saved before it was stored."""
+    for meta in entries.values():
+        if "xp_per_min" not in meta:
+            meta["xp_per_min"] = meta["base_xp"] / meta["base_minutes"]
+    return entries
+
+def _log_record(row):
+    """One JSON-serializable log record (the derived date column is not stored)."""
+    return {
+        "time": row["time"].isoformat(),
+        "type": row["type"],
+        "name": row["name"],
+        "minutes": int(row["minutes"]),
+        "xp": float(row["xp"]),
+    }
+
+def _migrate_csv_log(csv_path, path):
+    """One-off import of the old CSV log into the JSONL log; returns its rows."""
+    import pandas as pd  # deferred: pandas is only needed once the log is turned into a DataFrame
+    try:
+        # Explicit dtypes and a fixed ISO-8601 timestamp format skip pandas' type/format inference
+        df = pd.read_csv(
+            csv_path,
+            engine="c",
+            dtype=LOG_DTYPES,
+            parse_dates=["time"],
+            date_format="ISO8601",
+        )
+    except FileNotFoundError:
+        return []
+    rows = df.to_dict("records")
+    _atomic_write(path, b"".join(json_dumps(_log_record(row)) + b"\n" for row in rows))
+    for row in rows:
+        row["time"] = row["time"].to_pydatetime()
+        row["date"] = row["time"].date()
+    return rows
 
 def load_log(path):
-    if os.path.exists(path):
-        return pd.read_csv(path, parse_dates=["time"])
-    return pd.DataFrame(columns=["time", "type", "name", "minutes", "xp"])
+    """
+    Reads the JSONL log into a list of row dicts.
+    A torn last line (an append cut off by a crash) is dropped and cut from the file.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return _migrate_csv_log(LEGACY_LOG_FILE, path)
+    lines = data.split(b"\n")
+    # Every complete record ends with a newline, so anything after the last one is a partial append
+    good_size = len(data) - len(lines.pop())
+    rows = []
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        try:
+            row = json_loads(line)
+        except ValueError:
+            if i != len(lines) - 1:
+                raise
+            # Garbage in the final line (e.g. zero-filled after power loss): drop it as well
+            good_size -= len(line) + 1
+            break
+        row["time"] = datetime.fromisoformat(row["time"])
+        # Calendar day of each entry, derived once here (and at append time) instead of on every render
+        row["date"] = row["time"].date()
+        rows.append(row)
+    if good_size < len(data):
+        # Cut the fragment off so the next append starts on a fresh line
+        with open(path, "r+b") as f:
+            f.truncate(good_size)
+    return rows
+
+def append_log_row(row, path):
+    """
+    Appends a single log entry as one JSON line instead of rewriting the whole file.
+    Returns the byte offset where the new line starts (used by undo to truncate it again).
+    """
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(json_dumps(_log_record(row)) + b"\n")
+    return offset
+
+def _last_line_offset(f):
+    """Scans backwards from the end of an open binary file for the start of its last line."""
+    pos = f.seek(0, os.SEEK_END)
+    tail = b""
+    while pos > 0:
+        step = min(4096, pos)
+        pos -= step
+        f.seek(pos)
+        tail = f.read(step) + tail
+        # Ignore the last line's own trailing newline
+        idx = tail.rfind(b"\n", 0, len(tail) - 1)
+        if idx != -1:
+            return pos + idx + 1
+    return 0
+
+def truncate_last_log_row(path, offset=None):
+    """Removes the last line of the log file in place; offset is where it starts, if known."""
+    with open(path, "r+b") as f:
+        if offset is None:
+            offset = _last_line_offset(f)
+        f.truncate(offset)
+
+def log_memo(key, build):
+    """Return build() cached in session_state under key until the XP log changes."""
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] != st.session_state.log_version:
+        cached = (st.session_state.log_version, build())
+        st.session_state[key] = cached
+    return cached[1]
+
+def get_log_df():
+    """Materialize the in-memory log rows as a DataFrame, rebuilt only when the log changes."""
+    def build():
+        import pandas as pd  # deferred: only the Statistics/Calendar views need a DataFrame
+        return pd.DataFrame(st.session_state.log_rows, columns=[*LOG_COLUMNS, "date"])
+    return log_memo("_log_df_cache", build)
+
+def daily_totals():
+    """Map each logged date to its (earned, spent) XP totals."""
+    def build():
+        import pandas as pd
+        df = get_log_df()
+        g = df.groupby(["date", "type"])["xp"].sum().unstack(fill_value=0)
+        earned = g["Add"] if "Add" in g.columns else pd.Series(0.0, index=g.index)
+        spent = g["Spend"] if "Spend" in g.columns else pd.Series(0.0, index=g.index)
+        return dict(zip(g.index, zip(earned.astype(float), spent.astype(float))))
+    return log_memo("_daily_totals_cache", build)
+
+def sorted_log_df():
+    """Log sorted by time with the signed XP and its running total."""
+    def build():
+        import numpy as np
+        df_sorted = get_log_df().sort_values("time")
+        signs = np.where(df_sorted["type"].to_numpy() == "Add", 1.0, -1.0)
+        df_sorted["signed_xp"] = signs * df_sorted["xp"].to_numpy(dtype=float)
+        df_sorted["cumsum"] = np.cumsum(df_sorted["signed_xp"].to_numpy())
+        return df_sorted
+    return log_memo("_sorted_log_cache", build)
+
+def cumulative_xp_fig():
+    """Line chart of the total XP over time (rebuilt only when the log changes)."""
+    def build():
+        import plotly.express as px  # deferred: only needed once the Statistics tab is opened
+        return px.line(sorted_log_df(), x="time", y="cumsum", labels={"cumsum": "Total XP", "time": "Time"})
+    return log_memo("_cum_fig_cache", build)
+
+def earned_by_task_fig():
+    """Bar chart of the XP earned per task, or None when nothing was earned yet."""
+    def build():
+        import plotly.express as px
+        df_sorted = sorted_log_df()
+        earned_df = df_sorted[df_sorted['type'] == 'Add'].groupby('name')['xp'].sum().reset_index()
+        if earned_df.empty:
+            return None
+        return px.bar(
+            earned_df.sort_values('xp', ascending=False),
+            x='name',
+            y='xp',
+            labels={'xp': 'Total Earned XP', 'name': 'Task'},
+            title='XP Earned Breakdown by Task'
+        )
+    return log_memo("_bar_fig_cache", build)
+
+# Calendar grid layout for a month (Sunday-first weeks); cached across reruns
+_cal = calendar.Calendar(firstweekday=6)
 
-def save_log(df, path):
-    df.to_csv(path, index=False)
+@st.cache_data(show_spinner=False)
+def month_matrix(year, month):
+    return _cal.monthdatescalendar(year, month)
+
+def calendar_heatmap():
+    """
+    Net XP per day as a heatmap: one row per week, one column per weekday, covering the months
+    that contain activity. Returns (figure, {date: (row, col)}).
+    """
+    def build():
+        import plotly.graph_objects as go  # deferred: only needed once the Calendar tab is opened
+        totals = daily_totals()
+        months = sorted({(d.year, d.month) for d in totals})
+        month_set = set(months)
+
+        weeks = []
+        for year, month in months:
+            for week in month_matrix(year, month):
+                # Weeks spanning two months appear in both month grids
+                if not weeks or weeks[-1][0] != week[0]:
+                    weeks.append(week)
+
+        week_labels = [week[0].strftime("%d %b %Y") for week in weeks]
+        z, text, hover = [], [], []
+        cell_positions = {}
+        # Heatmap cells can't be selected in Plotly, so clicks land on an invisible marker per day
+        click_x, click_y, click_dates, click_hover = [], [], [], []
+        for row_i, week in enumerate(weeks):
+            z_row, text_row, hover_row = [], [], []
+            for col_i, day in enumerate(week):
+                if (day.year, day.month) not in month_set:
+                    z_row.append(None)
+                    text_row.append("")
+                    hover_row.append("")
+                    continue
+                earned, spent = totals.get(day, (0.0, 0.0))
+                z_row.append(earned - spent)
+                text_row.append(day.strftime("%d %b") if day.day == 1 else str(day.day))
+                hover_row.append(f"{day.strftime('%d %b %Y')}<br>E: {earned:.0f} | S: {spent:.0f}")
+                cell_positions[day] = (row_i, col_i)
+                click_x.append(WEEK_DAYS[col_i])
+                click_y.append(week_labels[row_i])
+                click_dates.append(day.isoformat())
+                click_hover.append(hover_row[-1])
+            z.append(z_row)
+            text.append(text_row)
+            hover.append(hover_row)
+
+        fig = go.Figure(go.Heatmap(
+            z=z,
+            x=list(WEEK_DAYS),
+            y=week_labels,
+            text=text,
+            texttemplate="%{text}",
+            hoverinfo="skip",
+            colorscale="Blues",
+            colorbar=dict(title="Net XP"),
+            xgap=3,
+            ygap=3,
+        ))
+        fig.add_trace(go.Scatter(
+            x=click_x,
+            y=click_y,
+            customdata=click_dates,
+            hovertext=click_hover,
+            hoverinfo="text",
+            mode="markers",
+            marker=dict(symbol="square", size=40, opacity=0),
+            selected=dict(marker=dict(opacity=0)),
+            unselected=dict(marker=dict(opacity=0)),
+            showlegend=False,
+        ))
+        fig.update_xaxes(side="top")
+        fig.update_yaxes(autorange="reversed", title="Week of")
+        fig.update_layout(height=120 + 45 * len(weeks), margin=dict(l=10, r=10, t=40, b=10))
+        return fig, cell_positions
+    return log_memo("_calendar_heatmap_cache", build)
 
 # ----------------------------
-# XP Formula Implementation (Task Earning)
+# XP Formula Core (shared by task earning and reward cost)
 # ----------------------------
-def calculate_task_xp(base_xp, base_minutes, multiplier, actual_minutes):
+def _xp_core(xp_per_min, base_minutes, multiplier, actual_minutes):
     """
-    Calculates XP using the formula:
-    XP = ROUND( (base_xp/base_minutes * T) * (Multiplier) ^ ((T-Base_minutes)/Base_minutes), 0)
-    T is actual_minutes
+    Raw (unrounded) value of the formula:
+    (xp_per_min * T) * (Multiplier) ^ ((T-Base_minutes)/Base_minutes)
+    T is actual_minutes, xp_per_min is base_xp/base_minutes (stored with the task/reward)
     """
-    if actual_minutes < base_minutes:
-        # If less than min time, we give proportional XP.
-        xp_calc = (actual_minutes / base_minutes) * base_xp
-        return round(xp_calc, 2) # Use float precision for partial completion
-    
-    # Base XP per minute
-    base_xp_per_min = base_xp / base_minutes
-    
     # Part 1: Proportional XP
-    proportional_xp = base_xp_per_min * actual_minutes
+    proportional_xp = xp_per_min * actual_minutes
     
     # Part 2: Multiplier
     # (T - Base_minutes) / Base_minutes
@@ -80,81 +364,85 @@ def calculate_task_xp(base_xp, base_minutes, multiplier, actual_minutes):
     # (Multiplier) ^ exponent
     multiplier_factor = multiplier ** exponent
     
-    # Total XP
-    total_xp = proportional_xp * multiplier_factor
+    return proportional_xp * multiplier_factor
+
+
+# ----------------------------
+# XP Formula Implementation (Task Earning)
+# ----------------------------
+def calculate_task_xp(xp_per_min, base_minutes, multiplier, actual_minutes):
+    """
+    Calculates XP using the formula:
+    XP = ROUND( (base_xp/base_minutes * T) * (Multiplier) ^ ((T-Base_minutes)/Base_minutes), 0)
+    T is actual_minutes, xp_per_min is the precomputed base_xp/base_minutes
+    """
+    if actual_minutes < base_minutes:
+        # If less than min time, we give proportional XP.
+        xp_calc = xp_per_min * actual_minutes
+        return round(xp_calc, 2) # Use float precision for partial completion
     
     # The requirement is to round the final result to the nearest integer.
-    return int(np.round(total_xp, 0))
+    # (builtin round on a float scalar; same half-to-even rule as np.round)
+    return int(round(_xp_core(xp_per_min, base_minutes, multiplier, actual_minutes)))
 
 
 # ----------------------------
 # XP Formula Implementation (Reward Cost)
 # ----------------------------
-def calculate_reward_cost(base_xp_cost, base_minutes, multiplier, actual_minutes):
+def calculate_reward_cost(xp_per_min, base_minutes, multiplier, actual_minutes):
     """
     Calculates XP cost using the formula (same structure as task XP, but for cost):
     Cost = ROUND( (base_xp/base_minutes * T) * (Multiplier) ^ ((T-Base_minutes)/Base_minutes), 0)
-    T is actual_minutes
+    T is actual_minutes, xp_per_min is the precomputed base_xp/base_minutes
     """
     if actual_minutes < base_minutes:
         # If less than min time, we use proportional cost.
-        xp_calc = (actual_minutes / base_minutes) * base_xp_cost
+        xp_calc = xp_per_min * actual_minutes
         return round(xp_calc, 2) # Use float precision for partial completion
         
-    # Base XP cost per minute
-    base_xp_per_min = base_xp_cost / base_minutes
-    
-    # Part 1: Proportional XP
-    proportional_xp = base_xp_per_min * actual_minutes
-    
-    # Part 2: Multiplier
-    # (T - Base_minutes) / Base_minutes
-    exponent = (actual_minutes - base_minutes) / base_minutes
-    
-    # (Multiplier) ^ exponent
-    multiplier_factor = multiplier ** exponent
-    
-    # Total XP Cost
-    total_xp = proportional_xp * multiplier_factor
-    
     # Round the final result to the nearest integer.
-    return int(np.round(total_xp, 0))
+    return int(round(_xp_core(xp_per_min, base_minutes, multiplier, actual_minutes)))
 
 
 # ----------------------------
 # Initialize persistent storages
 # ----------------------------
-if "tasks" not in st.session_state:
-    st.session_state.tasks = load_json(TASKS_FILE)
-if "rewards" not in st.session_state:
-    st.session_state.rewards = load_json(REWARDS_FILE)
-if "log_df" not in st.session_state:
-    st.session_state.log_df = load_log(LOG_FILE)
-
+# compute current total XP from log
+def compute_total_xp(rows):
+    earned = sum(row["xp"] for row in rows if row["type"] == "Add")
+    spent = sum(row["xp"] for row in rows if row["type"] == "Spend")
+    return float(earned) - float(spent)
 
-# --- TIMER STATE INITIALIZATION ---
-if 'timer_active' not in st.session_state:
+# Bump when the session state set up below changes shape, so open sessions re-initialize
+DATA_VERSION = 1
+
+# One check per rerun: files are read and state is seeded only when a session starts
+if st.session_state.get("_data_version") != DATA_VERSION:
+    st.session_state.tasks = with_xp_per_min(load_json(TASKS_FILE))
+    st.session_state.rewards = with_xp_per_min(load_json(REWARDS_FILE))
+    # Plain list of row dicts: appending is O(1), a DataFrame is only built for stats/calendar
+    st.session_state.log_rows = load_log(LOG_FILE)
+    # Never reuse a version number, so no log_memo cache from before survives
+    st.session_state.log_version = st.session_state.get("log_version", -1) + 1
+    # Byte offset of the last appended line in LOG_FILE (None = unknown, undo scans for it)
+    st.session_state.log_tail_offset = None
+    # Running balance: computed once per session, then adjusted whenever a row is logged/undone
+    st.session_state.total_xp = compute_total_xp(st.session_state.log_rows)
+
+    # --- TIMER STATE INITIALIZATION ---
     st.session_state.timer_active = False
-if 'start_time' not in st.session_state:
     st.session_state.start_time = None
-if 'session_type' not in st.session_state:
     st.session_state.session_type = None
-if 'target_minutes' not in st.session_state:
     st.session_state.target_minutes = 0
-if 'xp_value' not in st.session_state:
     st.session_state.xp_value = 0
-if 'session_details' not in st.session_state:
     st.session_state.session_details = {}
-# ----------------------------------
 
+    st.session_state._data_version = DATA_VERSION
+# ----------------------------------
 
-# compute current total XP from log
-def compute_total_xp(df):
-    if df.empty:
-        return 0.0
-    earned = df.loc[df["type"] == "Add", "xp"].sum()
-    spent = df.loc[df["type"] == "Spend", "xp"].sum()
-    return float(earned) - float(spent)
+# Selectbox options, built once per rerun and shared by the manager and session tabs
+task_names = tuple(st.session_state.tasks.keys())
+reward_names = tuple(st.session_state.rewards.keys())
 
 
 # --- TIMER HELPER ---
@@ -172,21 +460,121 @@ def play_ring_sound():
         """,
         unsafe_allow_html=True,
     )
+
+def render_timer():
+    """
+    Draws the running session timer and closes the session once the time is up.
+    Returns False when the session has just finished, so the normal page can be drawn in the same run.
+    """
+    is_add = st.session_state.session_type == "add"
+
+    elapsed_seconds = (datetime.now() - st.session_state.start_time).total_seconds()
+    target_seconds = st.session_state.target_minutes * 60
+
+    remaining_seconds = max(0, target_seconds - elapsed_seconds)
+
+    if remaining_seconds <= 0:
+        details = st.session_state.session_details
+
+        if is_add:
+            # --- TIMER END: AWARD XP ---
+            xp_to_log = st.session_state.xp_value
+
+            # Log the XP
+            now = datetime.now()
+            row = {"time": now, "type": "Add", "name": details['name'], "minutes": details['minutes'], "xp": xp_to_log, "date": now.date()}
+            st.session_state.log_rows.append(row)
+            st.session_state.log_version += 1
+            st.session_state.total_xp += xp_to_log
+            st.session_state.log_tail_offset = append_log_row(row, LOG_FILE)
+        # (Spend sessions already logged their cost when they started)
+
+        # Reset Timer State
+        st.session_state.timer_active = False
+        st.session_state.start_time = None
+        st.session_state.session_type = None
+
+        play_ring_sound()
+        if is_add:
+            st.balloons()
+            st.toast(f"🎉 **SESSION COMPLETE!** Logged +{xp_to_log:.0f} XP for {details['name']} ({details['minutes']} min).")
+        else:
+            st.toast(f"**SESSION COMPLETE!** Your reward session for {details['name']} is over.")
+        return False
+
+    if is_add:
+        st.header("➕ Session: Earn XP (do a task)")
+    else:
+        st.header("💸 Session: Spend XP (use a reward)")
+    st.write(f"Total XP: *{st.session_state.total_xp:.0f}*")
+
+    # Display progress bar and timer
+    st.subheader(f"Session Active: {st.session_state.session_details['name']}")
+
+    # The countdown and progress bar are repainted in the browser, so the server is not
+    # woken up every second just to redraw MM:SS
+    total_ms = int(target_seconds * 1000)
+    remaining_ms = int(remaining_seconds * 1000)
+    st.iframe(
+        f"""
+        <div style="font-family: sans-serif; text-align: center;">
+            <div id="clock" style="font-size: 2.5em; font-weight: 700; color: #ff4b4b;"></div>
+            <div style="background: rgba(128, 128, 128, 0.25); border-radius: 4px; height: 10px; margin: 8px 0;">
+                <div id="bar" style="background: #ff4b4b; border-radius: 4px; height: 10px; width: 0%;"></div>
+            </div>
+            <div id="left" style="font-size: 0.9em; color: #808080;"></div>
+        </div>
+        <script>
+            const total = {total_ms};
+            const end = Date.now() + {remaining_ms};
+            function tick() {{
+                const r = Math.max(0, end - Date.now());
+                const m = Math.floor(r / 60000);
+                const s = Math.floor((r % 60000) / 1000);
+                document.getElementById("clock").innerText = String(m).padStart(2, "0") + ":" + String(s).padStart(2, "0");
+                document.getElementById("bar").style.width = (total > 0 ? 100 * (1 - r / total) : 100) + "%";
+                document.getElementById("left").innerText = "Time remaining: " + m + " min " + s + " sec";
+            }}
+            tick();
+            setInterval(tick, 500);
+        </script>
+        """,
+        height=110,
+    )
+
+    # A rerun when the countdown reaches zero closes the session (small margin so it is really over).
+    # Capped at a minute: browsers treat setInterval delays above 2^31-1 ms as ~0, and an early
+    # rerun is harmless because the remaining time is recomputed above.
+    st_autorefresh(interval=min(remaining_ms + 250, 60_000), limit=None, key=f"tick_{st.session_state.session_type}")
+    return True
 # --------------------
 
 
 # ----------------------------
-# UI: top tabs (chrome-like) - This sets up the tabs visually
+# UI: top tabs (chrome-like) - a horizontal radio, so only the selected tab's body is executed
+# (st.tabs runs every tab's code on every rerun, including the Statistics and Calendar builds)
 # ----------------------------
 st.set_page_config(page_title="XP Tracker", layout="wide")
-tabs = st.tabs(["➕ Add XP", "💸 Spend XP", "📝 Task Manager", "🎯 Reward Manager", "📊 Statistics", "📅 Calendar", "⚙️ Reset Data"])
-add_tab, spend_tab, task_tab, reward_tab, stats_tab, cal_tab, reset_tab = tabs
+active_tab = st.radio(
+    "View",
+    ["➕ Add XP", "💸 Spend XP", "📝 Task Manager", "🎯 Reward Manager", "📊 Statistics", "📅 Calendar", "⚙️ Reset Data"],
+    horizontal=True,
+    key="active_tab",
+    label_visibility="collapsed",
+)
 # -------------------------------------------------------------
 
+# ----------------------------
+# Active session: the running timer replaces whichever tab is selected
+# ----------------------------
+if st.session_state.timer_active:
+    if render_timer():
+        st.stop()
+
 # ----------------------------
 # TAB: Task Manager (create/edit) 
 # ----------------------------
-with task_tab:
+if active_tab == "📝 Task Manager":
     st.header("📝 Task Manager — Create tasks that give XP")
     st.write("Define task rules: Base time (min duration), XP for that time, and the multiplier for extended work.")
     with st.form("task_form", clear_on_submit=True):
@@ -210,9 +598,11 @@ with task_tab:
                 st.session_state.tasks[new_name.strip()] = {
                     "base_minutes": int(base_minutes),
                     "base_xp": float(base_xp),
-                    "multiplier": float(multiplier)
+                    "multiplier": float(multiplier),
+                    "xp_per_min": float(base_xp) / int(base_minutes)
                 }
                 save_json(TASKS_FILE, st.session_state.tasks)
+                task_names = tuple(st.session_state.tasks.keys())
                 st.success(f"Saved task: {new_name.strip()} — {base_minutes} min = {base_xp} XP, Multiplier: {multiplier}")
 
     if st.session_state.tasks:
@@ -221,7 +611,7 @@ with task_tab:
             m = meta.get('multiplier', 1.0) 
             st.write(f"- **{tname}** | Base: {meta['base_minutes']} min = {meta['base_xp']} XP | **Multiplier: {m}**")
         st.write("---")
-        to_delete = st.selectbox("Delete task (choose one)", options=[""] + list(st.session_state.tasks.keys()), key="task_to_delete")
+        to_delete = st.selectbox("Delete task (choose one)", options=("",) + task_names, key="task_to_delete")
         if to_delete:
             if st.button("Delete task"):
                 st.session_state.tasks.pop(to_delete, None)
@@ -231,7 +621,7 @@ with task_tab:
 # ----------------------------
 # TAB: Reward Manager
 # ----------------------------
-with reward_tab:
+if active_tab == "🎯 Reward Manager":
     st.header("🎯 Reward Manager — Create rewards that cost XP")
     st.write("Create rewards with a base time, base XP cost, and a **Multiplier** for proportional/exponential cost growth.")
     with st.form("reward_form", clear_on_submit=True):
@@ -252,9 +642,11 @@ with reward_tab:
                 st.session_state.rewards[new_rname.strip()] = {
                     "base_minutes": int(r_base_minutes),
                     "base_xp": float(r_base_xp),
-                    "multiplier": float(r_multiplier)
+                    "multiplier": float(r_multiplier),
+                    "xp_per_min": float(r_base_xp) / int(r_base_minutes)
                 }
                 save_json(REWARDS_FILE, st.session_state.rewards)
+                reward_names = tuple(st.session_state.rewards.keys())
                 st.success(f"Saved reward: {new_rname.strip()} — {r_base_minutes} min = {r_base_xp} XP, Multiplier: {r_multiplier}")
 
     if st.session_state.rewards:
@@ -263,7 +655,7 @@ with reward_tab:
             m = meta.get('multiplier', 1.0)
             st.write(f"- *{rname}* | Base: {meta['base_minutes']} min = {meta['base_xp']} XP | **Multiplier: {m}** (cost)")
         st.write("---")
-        r_to_delete = st.selectbox("Delete reward (choose one)", options=[""] + list(st.session_state.rewards.keys()), key="reward_to_delete")
+        r_to_delete = st.selectbox("Delete reward (choose one)", options=("",) + reward_names, key="reward_to_delete")
         if r_to_delete:
             if st.button("Delete reward", key="delete_reward_btn"):
                 st.session_state.rewards.pop(r_to_delete, None)
@@ -271,243 +663,136 @@ with reward_tab:
                 st.success(f"Deleted reward '{r_to_delete}'")
 
 # ----------------------------
-# TAB: Add XP (log doing tasks) - UPDATED FOR TIMER
+# TAB: Add XP (log doing tasks) - START FORM, timer is drawn by render_timer()
 # ----------------------------
-with add_tab:
+if active_tab == "➕ Add XP":
     st.header("➕ Session: Earn XP (do a task)")
-    st.write(f"Total XP: *{compute_total_xp(st.session_state.log_df):.0f}*") 
+    st.write(f"Total XP: *{st.session_state.total_xp:.0f}*") 
 
-    if st.session_state.timer_active and st.session_state.session_type == "add":
-        # --- TIMER IS RUNNING ---
+    # --- TIMER IS IDLE: START FORM ---
+    xp_save_val = 0.0
+    is_disabled_add = True 
+    task_choice = None
+    minutes = 1
+    
+    if not st.session_state.tasks:
+        st.info("No tasks available. Go to *Task Manager* to create tasks.")
+    else:
+        is_disabled_add = False 
+        task_choice = st.selectbox("Choose task", options=task_names, key="add_task_choice")
+        base = st.session_state.tasks[task_choice]
+        multiplier_val = base.get('multiplier', 1.0) 
         
-        elapsed_seconds = (datetime.now() - st.session_state.start_time).total_seconds()
-        target_seconds = st.session_state.target_minutes * 60
+        st.write(f"Rules: **Min Duration: {base['base_minutes']} min**, **Base XP: {base['base_xp']}**, **Multiplier: {multiplier_val}**")
         
-        remaining_seconds = max(0, target_seconds - elapsed_seconds)
+        minutes = st.number_input("Target Minutes Performed", min_value=1, value=base["base_minutes"], step=1, key="add_minutes")
         
-        minutes_remaining = int(remaining_seconds // 60)
-        seconds_remaining = int(remaining_seconds % 60)
+        xp_calc = calculate_task_xp(xp_per_min=base['xp_per_min'], base_minutes=base["base_minutes"], multiplier=multiplier_val, actual_minutes=int(minutes))
         
-        progress = elapsed_seconds / target_seconds if target_seconds > 0 else 1.0
-
-        if remaining_seconds <= 0:
-            # --- TIMER END: AWARD XP ---
-            xp_to_log = st.session_state.xp_value
-            details = st.session_state.session_details
-            
-            # Log the XP
-            now = datetime.now()
-            row = {"time": now, "type": "Add", "name": details['name'], "minutes": details['minutes'], "xp": xp_to_log}
-            st.session_state.log_df = pd.concat([st.session_state.log_df, pd.DataFrame([row])], ignore_index=True)
-            save_log(st.session_state.log_df, LOG_FILE)
-            
-            # Reset Timer State
-            st.session_state.timer_active = False
-            st.session_state.start_time = None
-            st.session_state.session_type = None
-
-            play_ring_sound()
-            st.balloons()
-            st.success(f"🎉 **SESSION COMPLETE!** Logged +{xp_to_log:.0f} XP for {details['name']} ({details['minutes']} min).")
-            # Rerun to clear the timer display and show the success message clearly
-            time.sleep(1)
-            st.rerun()
-
-        # Display progress bar and timer
-        st.subheader(f"Session Active: {st.session_state.session_details['name']}")
-        
-        # Display the timer with a non-breaking space to keep it centered
-        st.markdown(
-            f"## <div style='text-align: center;'>{minutes_remaining:02d}:{seconds_remaining:02d}</div>", 
-            unsafe_allow_html=True
-        )
+        if isinstance(xp_calc, int):
+            st.info(f"You will earn: **{xp_calc} XP** for {minutes} min (Calculated using Multiplier)")
+            xp_save_val = float(xp_calc)
+        else:
+            st.warning(f"Duration is less than min duration. You earn proportional XP: **{xp_calc:.2f} XP** for {minutes} min")
+            xp_save_val = xp_calc
+
+    if st.button("▶️ START XP Session", key="start_add_session_btn", disabled=is_disabled_add):
+        # --- START TIMER LOGIC ---
+        st.session_state.timer_active = True
+        st.session_state.start_time = datetime.now()
+        st.session_state.session_type = "add"
+        st.session_state.target_minutes = int(minutes)
+        st.session_state.xp_value = xp_save_val
+        st.session_state.session_details = {'name': task_choice, 'minutes': int(minutes)}
         
-        st.progress(progress, text=f"Time remaining: {minutes_remaining} min {seconds_remaining} sec")
-
-        # Rerun the script every 1 second to update the timer display
-        time.sleep(1)
+        st.toast(f"Starting session for **{task_choice}** for {minutes} minutes.")
+        # Rerun to switch to the timer display immediately
         st.rerun()
-        
-    else:
-        # --- TIMER IS IDLE: START FORM ---
-        xp_save_val = 0.0
-        is_disabled_add = True 
-        task_choice = None
-        minutes = 1
-        
-        if not st.session_state.tasks:
-            st.info("No tasks available. Go to *Task Manager* to create tasks.")
-        else:
-            is_disabled_add = False 
-            task_choice = st.selectbox("Choose task", options=list(st.session_state.tasks.keys()), key="add_task_choice")
-            base = st.session_state.tasks[task_choice]
-            multiplier_val = base.get('multiplier', 1.0) 
-            
-            st.write(f"Rules: **Min Duration: {base['base_minutes']} min**, **Base XP: {base['base_xp']}**, **Multiplier: {multiplier_val}**")
-            
-            minutes = st.number_input("Target Minutes Performed", min_value=1, value=base["base_minutes"], step=1, key="add_minutes")
-            
-            xp_calc = calculate_task_xp(base_xp=base['base_xp'], base_minutes=base["base_minutes"], multiplier=multiplier_val, actual_minutes=int(minutes))
-            
-            if isinstance(xp_calc, int):
-                st.info(f"You will earn: **{xp_calc} XP** for {minutes} min (Calculated using Multiplier)")
-                xp_save_val = float(xp_calc)
-            else:
-                st.warning(f"Duration is less than min duration. You earn proportional XP: **{xp_calc:.2f} XP** for {minutes} min")
-                xp_save_val = xp_calc
-
-        if st.button("▶️ START XP Session", key="start_add_session_btn", disabled=is_disabled_add):
-            # --- START TIMER LOGIC ---
-            st.session_state.timer_active = True
-            st.session_state.start_time = datetime.now()
-            st.session_state.session_type = "add"
-            st.session_state.target_minutes = int(minutes)
-            st.session_state.xp_value = xp_save_val
-            st.session_state.session_details = {'name': task_choice, 'minutes': int(minutes)}
-            
-            st.info(f"Starting session for **{task_choice}** for {minutes} minutes.")
-            # Rerun to switch to the timer display immediately
-            time.sleep(1) 
-            st.rerun()
 
 # ----------------------------
-# TAB: Spend XP - UPDATED FOR TIMER
+# TAB: Spend XP - START FORM, timer is drawn by render_timer()
 # ----------------------------
-with spend_tab:
+if active_tab == "💸 Spend XP":
     st.header("💸 Session: Spend XP (use a reward)")
-    st.write(f"Total XP: *{compute_total_xp(st.session_state.log_df):.0f}*")
+    balance = st.session_state.total_xp
+    st.write(f"Total XP: *{balance:.0f}*")
 
-    balance = compute_total_xp(st.session_state.log_df)
+    # --- TIMER IS IDLE: START FORM ---
+    xp_save_val = 0.0
+    is_disabled_spend = True
+    reward_choice = None
+    rminutes = 1
 
-    if st.session_state.timer_active and st.session_state.session_type == "spend":
-        # --- TIMER IS RUNNING (SAME AS ADD XP) ---
-        
-        elapsed_seconds = (datetime.now() - st.session_state.start_time).total_seconds()
-        target_seconds = st.session_state.target_minutes * 60
-        remaining_seconds = max(0, target_seconds - elapsed_seconds)
-        
-        minutes_remaining = int(remaining_seconds // 60)
-        seconds_remaining = int(remaining_seconds % 60)
+    if not st.session_state.rewards:
+        st.info("No rewards available. Go to *Reward Manager* to create rewards.")
+    else:
+        is_disabled_spend = False 
+        reward_choice = st.selectbox("Choose reward", options=reward_names, key="spend_reward_choice")
+        rbase = st.session_state.rewards[reward_choice]
         
-        progress = elapsed_seconds / target_seconds if target_seconds > 0 else 1.0
+        r_multiplier_val = rbase.get('multiplier', 1.0)
+        st.write(f"Rules: **Min Duration: {rbase['base_minutes']} min**, **Base XP Cost: {rbase['base_xp']}**, **Multiplier: {r_multiplier_val}**")
 
-        if remaining_seconds <= 0:
-            # --- TIMER END: SESSION ENDED (XP ALREADY SPENT) ---
-            details = st.session_state.session_details
-            
-            # Reset Timer State
-            st.session_state.timer_active = False
-            st.session_state.start_time = None
-            st.session_state.session_type = None
-
-            play_ring_sound()
-            st.info(f"**SESSION COMPLETE!** Your reward session for {details['name']} is over.")
-            # Rerun to clear the timer display
-            time.sleep(1)
-            st.rerun()
-
-        # Display progress bar and timer
-        st.subheader(f"Session Active: {st.session_state.session_details['name']}")
+        rminutes = st.number_input("Target Minutes of reward", min_value=1, value=rbase["base_minutes"], step=1, key="spend_minutes")
         
-        st.markdown(
-            f"## <div style='text-align: center;'>{minutes_remaining:02d}:{seconds_remaining:02d}</div>", 
-            unsafe_allow_html=True
+        xp_cost = calculate_reward_cost(
+            xp_per_min=rbase['xp_per_min'],
+            base_minutes=rbase["base_minutes"],
+            multiplier=r_multiplier_val,
+            actual_minutes=int(rminutes)
         )
-        st.progress(progress, text=f"Time remaining: {minutes_remaining} min {seconds_remaining} sec")
-
-        # Rerun the script every 1 second to update the timer display
-        time.sleep(1)
-        st.rerun()
         
-    else:
-        # --- TIMER IS IDLE: START FORM ---
-        xp_save_val = 0.0
-        is_disabled_spend = True
-        reward_choice = None
-        rminutes = 1
-
-        if not st.session_state.rewards:
-            st.info("No rewards available. Go to *Reward Manager* to create rewards.")
+        if isinstance(xp_cost, int):
+            st.info(f"This will *cost: **{xp_cost} XP*** for {rminutes} min (Calculated using Multiplier)")
+            xp_save_val = float(xp_cost)
         else:
-            is_disabled_spend = False 
-            reward_choice = st.selectbox("Choose reward", options=list(st.session_state.rewards.keys()), key="spend_reward_choice")
-            rbase = st.session_state.rewards[reward_choice]
-            
-            r_multiplier_val = rbase.get('multiplier', 1.0)
-            st.write(f"Rules: **Min Duration: {rbase['base_minutes']} min**, **Base XP Cost: {rbase['base_xp']}**, **Multiplier: {r_multiplier_val}**")
+            st.warning(f"Duration is less than min duration. Proportional cost: **{xp_cost:.2f} XP** for {rminutes} min")
+            xp_save_val = xp_cost
 
-            rminutes = st.number_input("Target Minutes of reward", min_value=1, value=rbase["base_minutes"], step=1, key="spend_minutes")
-            
-            xp_cost = calculate_reward_cost(
-                base_xp_cost=rbase['base_xp'],
-                base_minutes=rbase["base_minutes"],
-                multiplier=r_multiplier_val,
-                actual_minutes=int(rminutes)
-            )
-            
-            if isinstance(xp_cost, int):
-                st.info(f"This will *cost: **{xp_cost} XP*** for {rminutes} min (Calculated using Multiplier)")
-                xp_save_val = float(xp_cost)
-            else:
-                st.warning(f"Duration is less than min duration. Proportional cost: **{xp_cost:.2f} XP** for {rminutes} min")
-                xp_save_val = xp_cost
-
-            if xp_save_val > balance:
-                st.error(f"Not enough XP! Current: {balance:.2f}, required: {xp_save_val:.2f}")
-                is_disabled_spend = True
-                
-        if st.button("▶️ START XP Session", key="start_spend_session_btn", disabled=is_disabled_spend):
-            # --- START TIMER & INSTANTLY LOG SPEND XP ---
-            
-            # 1. Log the Spend XP immediately
-            now = datetime.now()
-            row = {"time": now, "type": "Spend", "name": reward_choice, "minutes": int(rminutes), "xp": xp_save_val} 
-            st.session_state.log_df = pd.concat([st.session_state.log_df, pd.DataFrame([row])], ignore_index=True)
-            save_log(st.session_state.log_df, LOG_FILE)
-            
-            # 2. Start the Timer State
-            st.session_state.timer_active = True
-            st.session_state.start_time = datetime.now()
-            st.session_state.session_type = "spend"
-            st.session_state.target_minutes = int(rminutes)
-            st.session_state.xp_value = xp_save_val # Storing for future reference, even though it's already logged
-            st.session_state.session_details = {'name': reward_choice, 'minutes': int(rminutes)}
+        if xp_save_val > balance:
+            st.error(f"Not enough XP! Current: {balance:.2f}, required: {xp_save_val:.2f}")
+            is_disabled_spend = True
             
-            st.success(f"Cost of -{xp_save_val:.0f} XP logged instantly! Enjoy your reward session.")
-            # Rerun to switch to the timer display
-            time.sleep(1) 
-            st.rerun()
+    if st.button("▶️ START XP Session", key="start_spend_session_btn", disabled=is_disabled_spend):
+        # --- START TIMER & INSTANTLY LOG SPEND XP ---
+        
+        # 1. Log the Spend XP immediately
+        now = datetime.now()
+        row = {"time": now, "type": "Spend", "name": reward_choice, "minutes": int(rminutes), "xp": xp_save_val, "date": now.date()}
+        st.session_state.log_rows.append(row)
+        st.session_state.log_version += 1
+        st.session_state.total_xp -= xp_save_val
+        st.session_state.log_tail_offset = append_log_row(row, LOG_FILE)
+        
+        # 2. Start the Timer State
+        st.session_state.timer_active = True
+        st.session_state.start_time = datetime.now()
+        st.session_state.session_type = "spend"
+        st.session_state.target_minutes = int(rminutes)
+        st.session_state.xp_value = xp_save_val # Storing for future reference, even though it's already logged
+        st.session_state.session_details = {'name': reward_choice, 'minutes': int(rminutes)}
+        
+        st.toast(f"Cost of -{xp_save_val:.0f} XP logged instantly! Enjoy your reward session.")
+        # Rerun to switch to the timer display
+        st.rerun()
 
 # ----------------------------
 # TAB: Statistics (UNCHANGED)
 # ----------------------------
-with stats_tab:
+if active_tab == "📊 Statistics":
     st.header("📊 Statistics")
-    total = compute_total_xp(st.session_state.log_df)
+    total = st.session_state.total_xp
     st.subheader(f"Total XP: {total:.0f}")
 
-    if not st.session_state.log_df.empty:
-        df = st.session_state.log_df.copy()
-        df["time"] = pd.to_datetime(df["time"])
-        df_sorted = df.sort_values("time")
-        # cumulative total over time
-        df_sorted["signed_xp"] = df_sorted.apply(lambda r: r["xp"] if r["type"] == "Add" else -r["xp"], axis=1)
-        df_sorted["cumsum"] = df_sorted["signed_xp"].cumsum()
-        
+    if st.session_state.log_rows:
+        df_sorted = sorted_log_df()
+
         # Line chart for cumulative XP
-        fig = px.line(df_sorted, x="time", y="cumsum", labels={"cumsum": "Total XP", "time": "Time"})
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cumulative_xp_fig(), use_container_width=True)
 
         # Bar chart for XP breakdown by task
-        earned_df = df_sorted[df_sorted['type'] == 'Add'].groupby('name')['xp'].sum().reset_index()
-        if not earned_df.empty:
-            fig_bar = px.bar(
-                earned_df.sort_values('xp', ascending=False),
-                x='name',
-                y='xp',
-                labels={'xp': 'Total Earned XP', 'name': 'Task'},
-                title='XP Earned Breakdown by Task'
-            )
+        fig_bar = earned_by_task_fig()
+        if fig_bar is not None:
             st.plotly_chart(fig_bar, use_container_width=True)
             
         # show recent activity
@@ -517,85 +802,17 @@ with stats_tab:
         st.info("No activity logged yet.")
 
 # ----------------------------
-# TAB: Calendar (FIXED CSS so only calendar buttons are hidden)
+# TAB: Calendar (heatmap, click a day to open its summary)
 # ----------------------------
-with cal_tab:
-    st.header("📅 Calendar (click a day to open/close summary)")
-    
-    # --- Custom CSS for Calendar Styling ---
-    st.markdown("""
-    <style>
-    /* 0. STREAMLIT COLUMN HEADER ALIGNMENT */
-    .stHorizontalBlock {
-        align-items: flex-start !important;
-        margin-bottom: 5px; 
-    }
-    .stHorizontalBlock div[data-testid^="stMarkdownContainer"] {
-        text-align: center;
-    }
-
-    /* 1. INVISIBLE BUTTON: Only calendar buttons (keys start with cal_) */
-    button[data-testid="stButton"][id^="cal_"] {
-        height: 80px; 
-        width: 100%; 
-        aspect-ratio: 1 / 1; 
-        display: block;
-        padding: 0; 
-        margin: 0; 
-        margin-top: -5px; 
-        margin-left: 30px; 
-        
-        opacity: 0; /* hidden only for calendar */
-        position: relative;
-        z-index: 10; 
-        border: none !important; 
-        cursor: pointer;
-    }
-
-    /* Hover highlight for clickable calendar cells */
-    .calendar-cell-content:hover {
-        border: 2px solid var(--primary-color);
-        background-color: rgba(0, 123, 255, 0.1);
-    }
-
-    /* 2. VISIBLE CONTENT: Styles the div content that the user actually sees */
-    .calendar-cell-content {
-        height: 70px;
-        width: 70%;
-        position: relative;
-        top: -70px; 
-        margin-bottom: -85px; 
-        margin-left: 20px;
-        
-        display: flex;
-        flex-direction: column;
-        justify-content: flex-start;
-        align-items: center;
-        padding: 5px;
-        line-height: 1.2;
-        
-        border: 1px solid var(--border-color); 
-        border-radius: 4px;
-        z-index: 5;
-        background-color: var(--secondary-background); 
-        transition: border 0.1s;
-    }
-    
-    /* Highlight the actively selected day */
-    .calendar-cell-content.selected-day {
-        border: 3px solid var(--primary-color); 
-        padding: 3px; 
-    }
-
-    .date-number { font-size: 1.2em; font-weight: 800; color: var(--text-color); margin-bottom: 2px; }
-    .xp-totals { font-size: 0.75em; color: #808080; text-align: center; }
-    .empty-space { height: 80px; }
-    </style>
-    """, unsafe_allow_html=True)
+if active_tab == "📅 Calendar":
+    st.header("📅 Calendar (click a day to open its summary)")
     
     # --- Step 1: Initialize State for Toggle ---
     if 'selected_calendar_date' not in st.session_state:
         st.session_state.selected_calendar_date = None 
+    if 'cal_click_nonce' not in st.session_state:
+        # Bumped to give the chart a fresh key, which otherwise keeps returning the last selection
+        st.session_state.cal_click_nonce = 0
     
     # --- Step 2: Display Summary First (If Selected) ---
     selected_date_str = st.session_state.selected_calendar_date
@@ -606,163 +823,129 @@ with cal_tab:
         with st.container(border=True):
             st.markdown(f"### Activity Summary for {selected_date_obj.strftime('%d %b %Y')}")
             
-            df = st.session_state.log_df.copy()
-            df["time"] = pd.to_datetime(df["time"])
-            df["date"] = df["time"].dt.date 
+            df = get_log_df()
             day_rows = df[df["date"] == selected_date_obj].sort_values("time") 
             total_e = day_rows[day_rows["type"]=="Add"]["xp"].sum()
             total_s = day_rows[day_rows["type"]=="Spend"]["xp"].sum()
             
             if not day_rows.empty:
-                st.markdown('<div style="max-height: 300px; overflow-y: auto;">', unsafe_allow_html=True)
-                for _, r in day_rows.iterrows():
-                    tstr = r["time"].strftime("%I:%M %p")
-                    sign = "+" if r["type"] == "Add" else "-"
-                    st.write(f"&nbsp; • {tstr} — **{r['type']}**: {r['name']} ({r['minutes']} min) **{sign}{r['xp']:.2f} XP**")
-                st.markdown('</div>', unsafe_allow_html=True)
+                # Scrollable box (fixed-height container instead of hand-written <div style=...> markup),
+                # only once the day has enough entries to overflow it; short days keep their natural height
+                with st.container(height=300 if len(day_rows) > 8 else "content", border=False):
+                    # Plain column zip: no per-row Series (and no clash between the "name" column and namedtuple fields)
+                    for r_time, r_type, r_name, r_minutes, r_xp in zip(
+                        day_rows["time"], day_rows["type"], day_rows["name"], day_rows["minutes"], day_rows["xp"]
+                    ):
+                        tstr = r_time.strftime("%I:%M %p")
+                        sign = "+" if r_type == "Add" else "-"
+                        st.write(f"&nbsp; • {tstr} — **{r_type}**: {r_name} ({r_minutes} min) **{sign}{r_xp:.2f} XP**")
                 st.markdown("---")
                 st.markdown(f"**Total Earned:** {total_e:.0f} | **Total Spent:** {total_s:.2f}")
             else:
                 st.write("No activity recorded on this day.")
 
-            st.markdown(f'<p style="font-size: 0.85em; color: #aaa;">Click the **{selected_date_obj.day}** date box again to close this summary.</p>', unsafe_allow_html=True)
+            if st.button("Close summary", key="close_cal_summary"):
+                st.session_state.selected_calendar_date = None
+                st.session_state.cal_click_nonce += 1
+                st.rerun()
 
         st.markdown("---") 
 
-    # --- Step 3: Calendar Grid Logic ---
-    if not st.session_state.log_df.empty:
-        df = st.session_state.log_df.copy()
-        df["time"] = pd.to_datetime(df["time"])
-        df["date"] = df["time"].dt.date 
-
-        daily = df.groupby(["date", "type"])["xp"].sum().unstack(fill_value=0).reset_index()
-        daily["Earned"] = daily.get("Add", 0)
-        daily["Spent"] = daily.get("Spend", 0)
-
-        min_date = df["date"].min().replace(day=1)
-        max_dt = df["date"].max()
-        max_date = (max_dt.replace(day=1) + pd.offsets.MonthEnd(0)).date()
-
-        current = min_date
-        while current <= max_date:
-            st.subheader(current.strftime("%B %Y"))
-            week_days = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
-            header_cols = st.columns(7)
-            for i, wd in enumerate(week_days):
-                header_cols[i].markdown(f"**{wd}**") 
-
-            cal_obj = calendar.Calendar(firstweekday=6) 
-            month_matrix = cal_obj.monthdatescalendar(current.year, current.month)
-
-            for week in month_matrix:
-                cols = st.columns(7)
-                for i, day in enumerate(week):
-                    with cols[i]:
-                        if day.month != current.month:
-                            st.markdown("<div class='empty-space'></div>", unsafe_allow_html=True)
-                            continue
-
-                        row = daily[daily["date"] == day]
-                        earned = float(row["Earned"]) if not row.empty and "Earned" in row.columns else 0.0
-                        spent = float(row["Spent"]) if not row.empty and "Spent" in row.columns else 0.0
-                        
-                        key = f"cal_{day}"
-                        day_str = day.strftime('%Y-%m-%d') 
-
-                        if st.button("", key=key): 
-                            if st.session_state.selected_calendar_date == day_str:
-                                st.session_state.selected_calendar_date = None
-                            else:
-                                st.session_state.selected_calendar_date = day_str
-                            st.rerun() 
-
-                        highlight_class = " selected-day" if st.session_state.selected_calendar_date == day_str else ""
-                        visible_html = f"""
-                        <div class="calendar-cell-content{highlight_class}">
-                            <div class="date-number">{day.day}</div>
-                            <div class="xp-totals">E: {earned:.0f}<br>S: {spent:.0f}</div>
-                        </div>
-                        """
-                        st.markdown(visible_html, unsafe_allow_html=True)
-
-            current = (current + pd.offsets.MonthBegin(1)).date()
+    # --- Step 3: Calendar Heatmap (one Plotly component instead of a button per day) ---
+    if st.session_state.log_rows:
+        fig, cell_positions = calendar_heatmap()
+
+        selected_date_str = st.session_state.selected_calendar_date
+        if selected_date_str:
+            selected_pos = cell_positions.get(datetime.strptime(selected_date_str, '%Y-%m-%d').date())
+            if selected_pos is not None:
+                import plotly.graph_objects as go
+                # Outline the selected day on a copy, the cached figure is shared across reruns
+                row_i, col_i = selected_pos
+                fig = go.Figure(fig)
+                fig.add_shape(type="rect", x0=col_i - 0.5, x1=col_i + 0.5, y0=row_i - 0.5, y1=row_i + 0.5, line=dict(width=3))
+
+        event = st.plotly_chart(
+            fig,
+            on_select="rerun",
+            selection_mode="points",
+            key=f"cal_click_{st.session_state.cal_click_nonce}",
+        )
+        clicked = [p for p in event.selection.points if p.get("customdata")]
+        if clicked:
+            day_str = clicked[0]["customdata"]
+            if day_str != selected_date_str:
+                st.session_state.selected_calendar_date = day_str
+                st.rerun()
 
 # ----------------------------
 # TAB: Reset Data (FIXED FOR RELIABLE CONFIRMATION)
 # ----------------------------
-with reset_tab:
+if active_tab == "⚙️ Reset Data":
     st.header("⚙️ Data Management")
 
     # --- Utility Functions (unchanged) ---
     def reset_all_data():
-        """Deletes all data files and clears state."""
-        for file in [TASKS_FILE, REWARDS_FILE, LOG_FILE]:
-            if os.path.exists(file):
-                os.remove(file)
+        """Empties all data files and clears state."""
+        # Overwrite each file with its empty contents (no delete + re-serialize round trip)
+        _write_empty_json(TASKS_FILE)
+        _write_empty_json(REWARDS_FILE)
+        _atomic_write(LOG_FILE, b"")
         
-        # Reset session state and re-create empty files
+        # Reset session state
         st.session_state.tasks = {}
         st.session_state.rewards = {}
-        st.session_state.log_df = pd.DataFrame(columns=["time", "type", "name", "minutes", "xp"])
-        save_json(TASKS_FILE, st.session_state.tasks)
-        save_json(REWARDS_FILE, st.session_state.rewards)
-        save_log(st.session_state.log_df, LOG_FILE)
-        st.success("✅ All data (Tasks, Rewards, XP Log) has been successfully reset!")
-        time.sleep(2)
+        st.session_state.log_rows = []
+        st.session_state.log_tail_offset = None
+        st.session_state.log_version += 1
+        st.session_state.total_xp = 0.0
+        st.toast("All data (Tasks, Rewards, XP Log) has been successfully reset!", icon="✅")
         st.rerun()
 
     def reset_xp_log():
         """Resets the XP log (and statistics) only."""
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
+        _atomic_write(LOG_FILE, b"")
         
         # Reset session state log
-        st.session_state.log_df = pd.DataFrame(columns=["time", "type", "name", "minutes", "xp"])
-        save_log(st.session_state.log_df, LOG_FILE)
-        st.success("✅ XP Log and all statistics have been reset (Tasks and Rewards remain).")
-        time.sleep(2)
+        st.session_state.log_rows = []
+        st.session_state.log_tail_offset = None
+        st.session_state.log_version += 1
+        st.session_state.total_xp = 0.0
+        st.toast("XP Log and all statistics have been reset (Tasks and Rewards remain).", icon="✅")
         st.rerun()
 
     def reset_tasks():
         """Resets only the tasks."""
-        if os.path.exists(TASKS_FILE):
-            os.remove(TASKS_FILE)
-        
+        _write_empty_json(TASKS_FILE)
         st.session_state.tasks = {}
-        save_json(TASKS_FILE, st.session_state.tasks)
-        st.success("✅ All tasks have been deleted (XP and Rewards remain).")
-        time.sleep(2)
+        st.toast("All tasks have been deleted (XP and Rewards remain).", icon="✅")
         st.rerun()
 
     def reset_rewards():
         """Resets only the rewards."""
-        if os.path.exists(REWARDS_FILE):
-            os.remove(REWARDS_FILE)
-        
+        _write_empty_json(REWARDS_FILE)
         st.session_state.rewards = {}
-        save_json(REWARDS_FILE, st.session_state.rewards)
-        st.success("✅ All rewards have been deleted (XP and Tasks remain).")
-        time.sleep(2)
+        st.toast("All rewards have been deleted (XP and Tasks remain).", icon="✅")
         st.rerun()
 
     def undo_last_action():
         """Deletes the last entry from the XP log."""
-        if st.session_state.log_df.empty:
+        if not st.session_state.log_rows:
             st.warning("⚠️ No actions to undo.")
             return
 
-        # Get the row to be deleted (last row in the dataframe)
-        last_row = st.session_state.log_df.iloc[-1]
+        # Drop the last row (list.pop is O(1) and hands back the removed entry)
+        last_row = st.session_state.log_rows.pop()
         action = last_row["type"]
         name = last_row["name"]
         xp_value = last_row["xp"]
+        st.session_state.log_version += 1
+        st.session_state.total_xp += -xp_value if action == "Add" else xp_value
+        # Cut the row off the end of the file instead of rewriting the whole log
+        truncate_last_log_row(LOG_FILE, st.session_state.log_tail_offset)
+        st.session_state.log_tail_offset = None
 
-        # Drop the last row
-        st.session_state.log_df = st.session_state.log_df.drop(st.session_state.log_df.index[-1]).reset_index(drop=True)
-        save_log(st.session_state.log_df, LOG_FILE)
-
-        st.success(f"↩️ UNDO successful! Deleted last registered action: **{action} {name}** ({xp_value:.2f} XP).")
-        time.sleep(2)
+        st.toast(f"UNDO successful! Deleted last registered action: **{action} {name}** ({xp_value:.2f} XP).", icon="↩️")
         st.rerun()
 
 
@@ -770,12 +953,14 @@ with reset_tab:
     st.subheader("Undo Last Action")
     st.info("The Undo button deletes the very last item logged, whether it was adding XP or spending XP.")
     
-    current_log_df = st.session_state.log_df
-    last_action = "N/A"
-    
-    if not current_log_df.empty:
-        last_row = current_log_df.iloc[-1]
-        last_action = f"**{last_row['type']}** {last_row['name']} ({last_row['xp']:.2f} XP) at {pd.to_datetime(last_row['time']).strftime('%I:%M %p')}"
+    def describe_last_action():
+        if not st.session_state.log_rows:
+            return "N/A"
+        last_row = st.session_state.log_rows[-1]
+        return f"**{last_row['type']}** {last_row['name']} ({last_row['xp']:.2f} XP) at {last_row['time'].strftime('%I:%M %p')}"
+
+    # Formatted once per log change, not on every rerun of this tab (e.g. each checkbox toggle)
+    last_action = log_memo("_last_action_cache", describe_last_action)
 
     st.markdown(f"**Last Logged Action:** {last_action}")
     if st.button("↩️ UNDO Last Action", type="secondary", key="undo_btn"):
@@ -1,86 +1,95 @@
 # launcher.py (Final Robust Version with Connection Check)
-import webview
 import threading
-import subprocess
 import time
 import sys
 import os
-import requests # <--- NEW IMPORT
+import socket
 
 # Define the Streamlit server address and port
-STREAMLIT_URL = "http://localhost:8501"
+STREAMLIT_HOST = "localhost"
+STREAMLIT_PORT = 8501
+STREAMLIT_URL = f"http://{STREAMLIT_HOST}:{STREAMLIT_PORT}"
+
+# Folder the app lives in: next to the exe when frozen by PyInstaller, else next to this file.
+# (Never _MEIPASS: a onefile build extracts there to a temp folder that is deleted on exit.)
+if getattr(sys, "frozen", False):
+    APP_DIR = os.path.dirname(sys.executable)
+else:
+    APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(APP_DIR, "app.py")
+if not os.path.isfile(APP_SCRIPT) and hasattr(sys, "_MEIPASS"):
+    # No app.py shipped next to the exe: run the copy bundled by launcher.spec
+    APP_SCRIPT = os.path.join(sys._MEIPASS, "app.py")
+STREAMLIT_FLAGS = {
+    "server.port": STREAMLIT_PORT,
+    "server.headless": True,
+    "global.developmentMode": False,
+}
+
+# Shown in the window while the server is still starting (or if it never does)
+LOADING_HTML = '<html><body style="font-family:sans-serif;padding:3em">Starting XP Tracker…</body></html>'
+FAILED_HTML = '<html><body style="font-family:sans-serif;padding:3em">The XP Tracker server did not start. Please close this window and try again.</body></html>'
 
 def start_streamlit():
     """
-    Starts the Streamlit server in the background.
-    Uses 'python -m streamlit' to ensure the bundled interpreter runs the module.
+    Runs the Streamlit server inside this process (blocks; call it on a daemon thread).
+    One interpreter hosts both the window and the app, so nothing is imported twice.
     """
+    from streamlit.web import bootstrap
+
+    bootstrap.load_config_options(flag_options=STREAMLIT_FLAGS)
+    # Signal handlers can only be installed from the main thread, which PyWebView owns;
+    # the server thread is a daemon, so it simply ends with the launcher process.
+    # (Private Streamlit hook, present in the versions pinned in Requirements.txt.)
+    if hasattr(bootstrap, "_set_up_signal_handler"):
+        bootstrap._set_up_signal_handler = lambda server: None
+    bootstrap.run(APP_SCRIPT, False, [], STREAMLIT_FLAGS)
+
+def check_server_ready(host=STREAMLIT_HOST, port=STREAMLIT_PORT, timeout=30):
+    """Polls the server port until it accepts a TCP connection or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
     
-    # Flags to hide the console window on Windows
-    CREATE_NO_WINDOW = 0x08000000 
-    
-    # CRITICAL FIX: Use 'python', the executable name, to run the Streamlit module
-    cmd_list = [
-        "python",         # <-- Changed from "streamlit" to "python"
-        "-m",             # <-- Added '-m' to run a module
-        "streamlit",      # <-- Now running Streamlit as a module
-        "run", 
-        "app.py", 
-        "--server.port", "8501", 
-        "--server.headless", "true", 
-        "--global.developmentMode", "false"
-    ]
-    
-    if sys.platform.startswith('win'):
-        # Pass the command as a list and do NOT use shell=True
-        subprocess.Popen(cmd_list, creationflags=CREATE_NO_WINDOW)
-    else:
-        # Standard Popen call for Unix-like systems
-        subprocess.Popen(cmd_list)def check_server_ready(url, timeout=30):
-    """Polls the server URL until it responds successfully or the timeout expires."""
-    start_time = time.time()
-    
-    while time.time() - start_time < timeout:
+    while time.monotonic() < deadline:
         try:
-            # Attempt to get a response from the Streamlit server
-            response = requests.get(url, timeout=1) 
-            if response.status_code == 200:
+            # An open port is all we need to know; no HTTP round trip
+            with socket.create_connection((host, port), timeout=0.25):
                 print("Streamlit server is ready!")
                 return True
-        except requests.exceptions.RequestException:
+        except OSError:
             # Server not up yet, ignore and wait
             pass
         
-        # Wait a short period before checking again
-        time.sleep(1)
+        # Back off exponentially: probe often right after launch, less often later
+        time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 1.5, 0.5)
         
     print("Streamlit server failed to start within the timeout.")
     return False
 
+def load_app_when_ready(window):
+    """Runs on PyWebView's worker thread: swaps the loading page for the app once the server is up."""
+    if check_server_ready():
+        window.load_url(STREAMLIT_URL)
+    else:
+        # If the server never started, say so in the window (the console is hidden)
+        window.load_html(FAILED_HTML)
+
 if __name__ == '__main__':
-    # CRUCIAL FIX: Check if we are ALREADY running as the subprocess.
-    if not os.environ.get('STREAMLIT_SERVER_RUNNING'):
-        # Set an environment variable to prevent the subprocess from re-launching the main loop
-        os.environ['STREAMLIT_SERVER_RUNNING'] = '1'
-        
-        # 1. Start Streamlit server in a separate thread
-        threading.Thread(target=start_streamlit, daemon=True).start()
-        
-        # 2. WAIT for the Streamlit server to become ready
-        if check_server_ready(STREAMLIT_URL):
-            
-            # 3. Create the native desktop window using PyWebView
-            webview.create_window(
-                'XP Tracker Desktop App', 
-                url=STREAMLIT_URL, 
-                width=1200, 
-                height=800,
-                resizable=True
-            )
-            
-            # 4. Start the PyWebView main loop
-            webview.start()
-        else:
-            # If the server never started, inform the user (though this console will be hidden)
-            print("Application failed to launch because the Streamlit server did not start.")
-            # Optionally, you could use a system notification here, but often the console is sufficient
+    # 1. Start the Streamlit server on a daemon thread of this process
+    threading.Thread(target=start_streamlit, daemon=True).start()
+    
+    # Imported only now, so loading the GUI toolkit overlaps with the server's startup
+    import webview
+    
+    # 2. Create the native desktop window right away, showing a loading page
+    window = webview.create_window(
+        'XP Tracker Desktop App', 
+        html=LOADING_HTML, 
+        width=1200, 
+        height=800,
+        resizable=True
+    )
+    
+    # 3. Start the PyWebView main loop; it waits for the server in a background thread
+    webview.start(load_app_when_ready, window)
@@ -1,12 +1,24 @@
 # -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_all
+
+# The launcher runs app.py through Streamlit at runtime, so PyInstaller never sees app.py's
+# imports: bundle the script itself and collect its packages (code, data files, frontend assets).
+datas = [('app.py', '.')]
+binaries = []
+hiddenimports = ['orjson', 'numpy', 'webview']
+for package in ('streamlit', 'streamlit_autorefresh', 'plotly', 'pandas'):
+    package_datas, package_binaries, package_hiddenimports = collect_all(package)
+    datas += package_datas
+    binaries += package_binaries
+    hiddenimports += package_hiddenimports
 
 
 a = Analysis(
     ['launcher.py'],
     pathex=[],
-    binaries=[],
-    datas=[],
-    hiddenimports=[],
+    binaries=binaries,
+    datas=datas,
+    hiddenimports=hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],